@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional
 
 @dataclass
 class PriceOption:
@@ -36,4 +36,15 @@ class ProductRecord:
     # NEW:
     product_description: Optional[str] = None
     sales_strategy: Optional[Any] = None         # str or dict
-    discount_policy: Optional[Any] = None        # str or dict
\ No newline at end of file
+    discount_policy: Optional[Any] = None        # str or dict
+
+@dataclass(slots=True)
+class ProposalState:
+    """Last generated proposal, kept in Streamlit session_state across reruns."""
+    t_sel: Selection
+    i_sel: Selection
+    grand_total: float
+    warning_msg: Optional[str]
+    all_products: FrozenSet[str]
+    award_selected: bool
+    input_preview: str  # format_product_block(subset, sub_meta), built once per generation
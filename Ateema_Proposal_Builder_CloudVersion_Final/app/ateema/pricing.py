@@ -1,6 +1,7 @@
 from __future__ import annotations
-from typing import Any, List, Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
 from datetime import date
+from sys import intern
 from .models import ProductRecord
 
 # ================================================================
@@ -55,28 +56,50 @@ def booth_season_for_date(meta: dict, option_name: str, chosen_date: date) -> fl
 # ================================================================
 # Existing helpers
 # ================================================================
-def price_points(opt: dict) -> List[tuple[str, float]]:
+def _tier_sort_key(item: tuple[str, float]):
+    lbl, price = item
+    num = "".join(ch for ch in lbl if ch.isdigit() or ch == ".")
+    try:
+        x = float(num)
+    except:
+        x = float("inf")
+    return (x, price)
+
+def _build_price_points(opt: dict) -> tuple[tuple[str, float], ...]:
+    # tier labels repeat across options and products; interning makes the
+    # restricted-tier cache and label comparisons hit on identity
     items = []
     if isinstance(opt.get("price_usd"), dict):
-        items = [(str(k), float(v)) for k, v in opt["price_usd"].items()]
+        items = [(intern(str(k)), float(v)) for k, v in opt["price_usd"].items()]
     elif isinstance(opt.get("price_usd_by_plan"), dict):
-        items = [(str(k), float(v)) for k, v in opt["price_usd_by_plan"].items()]
+        items = [(intern(str(k)), float(v)) for k, v in opt["price_usd_by_plan"].items()]
     elif isinstance(opt.get("price_usd"), (int, float)):
         items = [("base", float(opt["price_usd"]))]
     elif isinstance(opt.get("pricing"), dict):
-        items = [(str(k), float(v)) for k, v in opt["pricing"].items()]
+        items = [(intern(str(k)), float(v)) for k, v in opt["pricing"].items()]
     else:
         items = []
 
-    def _key(lbl: str, price: float):
-        num = "".join(ch for ch in lbl if ch.isdigit() or ch == ".")
-        try:
-            x = float(num)
-        except:
-            x = float("inf")
-        return (x, price)
+    return tuple(sorted(items, key=_tier_sort_key))
 
-    return sorted(items, key=lambda t: _key(t[0], t[1]))
+def attach_price_points(catalog: Dict[str, ProductRecord]) -> None:
+    """
+    Store each option's sorted price points on the option dict under
+    "_price_points". Call once at load time, before the catalog is shared;
+    this is the only write, price_points() just reads it back.
+    """
+    for rec in catalog.values():
+        for opt in rec.price_options:
+            opt["_price_points"] = _build_price_points(opt)
+
+def price_points(opt: dict) -> tuple[tuple[str, float], ...]:
+    # Precomputed by attach_price_points; deepcopy (summit rules) carries the
+    # tuple along. Options that never went through it are built on the fly,
+    # without writing back into the (possibly shared) dict.
+    cached = opt.get("_price_points")
+    if cached is None:
+        cached = _build_price_points(opt)
+    return cached
 
 def option_min_budget(opt: dict) -> float:
     v = opt.get("target_budget_min")
@@ -140,29 +163,42 @@ def first_known_price(opt: dict) -> float | None:
 # ================================================================
 # Apply seasonal pricing BEFORE discounts | advertiser overrides (Dazhou 11/17)
 # ================================================================
-def get_effective_unit_price(product_name: str,
-                             option_name: str,
-                             base_price: float,
-                             meta: dict,
-                             chosen_date: Optional[date],
-                             is_advertiser: bool = False) -> float:
-    eff = base_price
+def option_price_override(product_name: str,
+                          option_name: str,
+                          meta: dict,
+                          chosen_date: Optional[date],
+                          is_advertiser: bool = False) -> float | None:
+    """
+    Price that replaces every tier's base price of one option (seasonal
+    window, then advertiser override), or None to keep the base price.
+    Independent of the tier, so callers can resolve it once per option.
+    """
+    seasonal = None
     if chosen_date:
         seasonal = booth_season_for_date(meta, option_name, chosen_date)
-        if seasonal is not None:
-            eff = seasonal
 
     adv_price, _ = advertiser_overrides(
         product_name=product_name,
         option_name=option_name,
-        base_price=eff,
-        tier="",                
+        base_price=seasonal,
+        tier="",
         is_advertiser=is_advertiser,
     )
     if adv_price is not None:
         return adv_price
 
-    return eff
+    return seasonal
+
+def get_effective_unit_price(product_name: str,
+                             option_name: str,
+                             base_price: float,
+                             meta: dict,
+                             chosen_date: Optional[date],
+                             is_advertiser: bool = False) -> float:
+    override = option_price_override(
+        product_name, option_name, meta, chosen_date, is_advertiser=is_advertiser
+    )
+    return base_price if override is None else override
 
 # ================================================================
 # Advertiser-specific price overrides (Dazhou 11/17)
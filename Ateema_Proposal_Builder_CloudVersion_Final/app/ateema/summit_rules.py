@@ -21,15 +21,19 @@ def filter_summit_booth(rec: ProductRecord, profile_text: str, is_advertiser: bo
     txt = profile_text or ""
     opts = rec.price_options or []
 
-    def is_label(label: str, key: str) -> bool:
-        return (key or "").lower() in (label or "").lower()
+    # lowercase each option name once, not once per rule
+    opts_l = [(o, (o.get("name") or "").lower()) for o in opts]
+
+    def with_label(key: str) -> list:
+        key_l = key.lower()
+        return [o for o, name_l in opts_l if key_l in name_l]
 
     if _contains_all(txt, "cvb", "illinois"):
-        out.price_options = [o for o in opts if is_label(o.get("name",""), "Illinois CVB")]
+        out.price_options = with_label("Illinois CVB")
         return out
 
     if _contains_any(txt, "dmo", "out-of-state", "out of state", "outside illinois"):
-        out.price_options = [o for o in opts if is_label(o.get("name",""), "DMO (out of Illinois)")]
+        out.price_options = with_label("DMO (out of Illinois)")
         return out
 
     # small business default
@@ -41,13 +45,14 @@ def filter_summit_booth(rec: ProductRecord, profile_text: str, is_advertiser: bo
         key = "Basic Booth — advertiser rate"
     out.price_options = [o for o in opts if o.get("name") == key]
     if not out.price_options:
-        out.price_options = [o for o in opts if "basic booth" in (o.get("name","").lower())]
+        out.price_options = with_label("basic booth")
     return out
 
 def apply_summit_rules(catalog: Dict[str, ProductRecord], profile_text: str, is_advertiser: bool) -> Dict[str, ProductRecord]:
     new = {}
     for name, rec in catalog.items():
-        if "summit" in name.lower() and "booth" in name.lower():
+        name_l = name.lower()
+        if "summit" in name_l and "booth" in name_l:
             new[name] = filter_summit_booth(rec, profile_text, is_advertiser)
         else:
             new[name] = rec
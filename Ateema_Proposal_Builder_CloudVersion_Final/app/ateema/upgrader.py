@@ -1,11 +1,17 @@
 from __future__ import annotations
-from typing import Dict, Tuple, Optional
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple, Optional
 from datetime import date
+import math
+from sys import intern
 
 from ateema.pricing import (
     price_points,
     effective_line_price,
-    get_effective_unit_price,
+    option_price_override,
 )
 from ateema.models import Selection, ProductRecord
 
@@ -13,40 +19,85 @@ import re
 
 
 # ------------------------------------------------------------
-# Utility: restricted tiers (unchanged)
+# Utility: restricted tiers
 # ------------------------------------------------------------
-def _is_restricted_tier(label: str, is_advertiser: bool) -> bool:
+# Tier labels containing any of these are advertiser / bundle-only rates.
+_RESTRICTED_KEYWORDS = frozenset({
+    "with any campaign",
+    "contract with multiple products",
+    "with campaign",
+    "existing advertiser",
+    "advertiser rate",
+    "bundle",
+    "add-on",
+    "package price",
+})
+
+# one alternation over all keywords (longest first), matched case-insensitively
+_RESTRICTED_RE = re.compile(
+    "|".join(
+        re.escape(kw)
+        for kw in sorted(_RESTRICTED_KEYWORDS, key=lambda k: (-len(k), k))
+    ),
+    re.IGNORECASE,
+)
+
+# "advertiser" that is not part of "non-advertiser" / "non advertiser"
+_ADVERTISER_RE = re.compile(r"(?<!non[- ])advertiser", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def _restricted_cached(label: str, is_advertiser: bool) -> bool:
     if is_advertiser:
         return False
 
-    lbl = label.lower()
-
-    restricted_keywords = [
-        "with any campaign",
-        "Contract with multiple products",
-        "with campaign",
-        "existing advertiser",
-        "advertiser rate",
-        "bundle",
-        "add-on",
-        "package price",
-    ]
-
-    if ("advertiser" in lbl
-        and "non-advertiser" not in lbl
-        and "non advertiser" not in lbl):
+    if _ADVERTISER_RE.search(label):
         return True
 
-    for kw in restricted_keywords:
-        if kw in lbl:
-            return True
+    return _RESTRICTED_RE.search(label) is not None
+
+
+def _is_restricted_tier(label: str, is_advertiser: bool) -> bool:
+    return _restricted_cached(label, bool(is_advertiser))
+
+
+# ------------------------------------------------------------
+# Utility: Summit Booth advertiser / non-advertiser options
+# ------------------------------------------------------------
+def _precompute_option_filters(
+    products: Dict[str, ProductRecord],
+    is_advertiser: bool,
+) -> Dict[str, List[bool]]:
+    """
+    One keep-flag per price option, aligned with product.price_options.
+    Only Summit Booth drops options (advertiser vs non-advertiser rate);
+    every other product keeps all of them.
+    """
+    flags: Dict[str, List[bool]] = {}
+
+    for pname, product in products.items():
+        pname_l = pname.lower()
+        if "summit" not in pname_l or "booth" not in pname_l:
+            flags[pname] = [True] * len(product.price_options)
+            continue
+
+        keep_flags: List[bool] = []
+        for opt in product.price_options:
+            low = opt.get("name", pname).lower()
+            has_non = ("non-advertiser" in low) or ("non advertiser" in low)
+            has_adv = ("advertiser" in low) and (not has_non)
+            keep_flags.append(not (has_non if is_advertiser else has_adv))
+        flags[pname] = keep_flags
 
-    return False
+    return flags
 
 
 # ------------------------------------------------------------
 # Chicago Map — NEW pricing model
 # ------------------------------------------------------------
+INTERACTIVE_MAP = "Chicago Does Interactive Map"
+
+
 def map_line_price(
     pname: str,
     tier_label: str,
@@ -57,7 +108,7 @@ def map_line_price(
     New pricing model for Chicago Does Interactive Map:
       cost = per-quarter price (tier-specific) × number_of_quarters
     """
-    if pname != "Chicago Does Interactive Map":
+    if pname != INTERACTIVE_MAP:
         return None  # signals "not handled here"
 
     if not interactive_map_quarters:
@@ -68,171 +119,289 @@ def map_line_price(
 
 
 # ------------------------------------------------------------
-# Core allocator — new Map handling added
+# Per-product tier table (materialized once per call)
 # ------------------------------------------------------------
-def greedy_fill_to_cap(
-    budget: float,
-    products: Dict[str, ProductRecord],
-    meta: Dict[str, dict],
-    chosen_date: Optional[date],
-    is_advertiser: bool = False,
-    interactive_map_quarters: Optional[int] = None,
-) -> Tuple[Selection, bool]:
+_UNRESOLVED = object()
 
-    picks: Dict[str, Tuple[str, str, float]] = {}
-    subtotal = 0.0
 
-    # --------------------------------------------------------
-    # Baseline picks (select initial tier for each product)
-    # --------------------------------------------------------
-    for pname, product in products.items():
-
-        best = None
-        best_line = None
+def _product_tiers(
+    pname: str,
+    product: ProductRecord,
+    keep: List[bool],
+    product_meta: dict,
+    chosen_date: Optional[date],
+    is_advertiser: bool,
+    interactive_map_quarters: Optional[int],
+) -> List[Tuple[str, str, float, float]]:
+    """
+    All allowed tiers of one product as (opt_name, lbl, eff_base, line),
+    sorted by line.
+    """
+    tiers: List[Tuple[str, str, float, float]] = []
 
-        for opt in product.price_options:
-            opt_name = opt.get("name", pname)
+    # Chicago Map uses custom total price formula (map_line_price)
+    is_map = pname == INTERACTIVE_MAP
 
-            # Summit Booth advertiser filter
-            if "summit" in pname.lower() and "booth" in pname.lower():
-                low = opt_name.lower()
-                has_non = ("non-advertiser" in low) or ("non advertiser" in low)
-                has_adv = ("advertiser" in low) and (not has_non)
+    for i, opt in enumerate(product.price_options):
+        # Summit Booth advertiser filter
+        if not keep[i]:
+            continue
 
-                if is_advertiser and has_non:
-                    continue
-                if (not is_advertiser) and has_adv:
-                    continue
+        opt_name = intern(opt.get("name", pname))
+        # seasonal / advertiser price is per option; resolved on the first
+        # allowed tier so options with none never evaluate it
+        override = _UNRESOLVED
 
-            for lbl, base_price in price_points(opt):
-                if _is_restricted_tier(lbl, is_advertiser):
-                    continue
+        for lbl, base_price in price_points(opt):
+            if _is_restricted_tier(lbl, is_advertiser):
+                continue
 
-                eff_base = get_effective_unit_price(
+            if override is _UNRESOLVED:
+                override = option_price_override(
                     pname,
                     opt_name,
-                    base_price,
-                    meta.get(pname, {}),
+                    product_meta,
                     chosen_date,
                     is_advertiser=is_advertiser,
                 )
+            eff_base = base_price if override is None else override
 
-                # --------------------------------------------------------
-                # NEW — Chicago Map uses custom total price formula
-                # --------------------------------------------------------
-                map_price = map_line_price(
-                    pname, lbl, eff_base, interactive_map_quarters
-                )
-                if map_price is not None:
-                    line = map_price
-                else:
-                    line = effective_line_price(product, lbl, eff_base)
-
-                # --------------------------------------------------------
-                # NEW — Chicago Map wants **highest tier under budget**
-                # --------------------------------------------------------
-                if pname == "Chicago Does Interactive Map":
-                    # pick highest valid (<=budget)
-                    if line <= budget and (best is None or line > best_line):
-                        best = (opt_name, lbl, eff_base)
-                        best_line = line
-                else:
-                    # normal products: cheapest-first baseline (unchanged)
-                    if best is None or line < best_line:
-                        best = (opt_name, lbl, eff_base)
-                        best_line = line
-
-        if best:
-            opt_name, lbl, eff_base = best
-
-            # compute cost again for subtotal
-            map_price = map_line_price(
-                pname, lbl, eff_base, interactive_map_quarters
-            )
-            if map_price is not None:
-                subtotal += map_price
+            if is_map:
+                line = map_line_price(pname, lbl, eff_base, interactive_map_quarters)
             else:
-                subtotal += effective_line_price(product, lbl, eff_base)
+                line = effective_line_price(product, lbl, eff_base)
+
+            tiers.append((opt_name, lbl, eff_base, line))
+
+    # stable sort: ties keep catalog order
+    tiers.sort(key=lambda t: t[3])
+    return tiers
+
+
+def _baseline_index(
+    is_map: bool,
+    lines: Sequence[float],
+    lo: int,
+    hi: int,
+    budget: float,
+) -> int:
+    """Index of the starting tier in lines[lo:hi] (sorted), or -1 for none."""
+    if lo == hi:
+        return -1
+
+    if is_map:
+        # Chicago Map wants **highest tier under budget**
+        i = bisect_right(lines, budget, lo, hi)
+        if i == lo:
+            return -1
+        # first tier at that price, as the original scan would pick
+        return bisect_left(lines, lines[i - 1], lo, hi)
+
+    # normal products: cheapest-first baseline
+    return lo
+
+
+def _best_upgrade(
+    lines: Sequence[float],
+    lo: int,
+    hi: int,
+    cur_line: float,
+    subtotal: float,
+    budget: float,
+) -> int:
+    """
+    Index of the cheapest tier in lines[lo:hi] priced above cur_line that
+    still fits the budget once it replaces the current line, or -1.
+    Lines are sorted, so only the first strictly-higher tier can fit.
+    """
+    i = bisect_right(lines, cur_line, lo, hi)
+    if i == hi or subtotal - cur_line + lines[i] > budget:
+        return -1
+    return i
+
+
+# ------------------------------------------------------------
+# Integer cents
+# ------------------------------------------------------------
+def _to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def _budget_cents(budget: float) -> int:
+    # Line prices are whole cents, so "line <= budget" holds exactly when
+    # it holds against the budget floored to cents (the inner round
+    # absorbs float noise such as 1000.0 * 0.29 * 100).
+    return math.floor(round(budget * 100, 6))
+
+
+# ------------------------------------------------------------
+# Pricing context — every allowed tier of a product set, flattened
+# ------------------------------------------------------------
+@dataclass(frozen=True)
+class PricingContext:
+    """
+    Budget-independent view of a product set for one
+    (meta, date, advertiser, map quarters) combination. Frozen, and the
+    allocator never writes to product_slice or min_step, but those two
+    are plain dicts: treat them as read-only.
+
+    Tiers of all products live in aligned flat tuples; product_slice
+    gives each product's range, sorted by line within the range.
+    Line prices are integer cents so the allocator compares exactly.
+    min_step is the smallest gap (cents) between two consecutive distinct
+    tiers of a product (inf when it has nothing to upgrade to).
+    is_map flags the Interactive Map, in product_slice order.
+    Built fresh by each greedy_fill_to_cap call; nothing caches it.
+    """
+    product_slice: Dict[str, slice]
+    opt_names: Tuple[str, ...]
+    labels: Tuple[str, ...]
+    eff_bases: Tuple[float, ...]
+    line_cents: Tuple[int, ...]
+    min_step: Dict[str, float]
+    is_map: Tuple[bool, ...]
+
+    @classmethod
+    def build(
+        cls,
+        products: Dict[str, ProductRecord],
+        meta: Dict[str, dict],
+        is_advertiser: bool,
+        chosen_date: Optional[date],
+        interactive_map_quarters: Optional[int] = None,
+    ) -> "PricingContext":
+        keep_flags = _precompute_option_filters(products, is_advertiser)
+
+        product_slice: Dict[str, slice] = {}
+        min_step: Dict[str, float] = {}
+        flat: List[Tuple[str, str, float, int]] = []
+
+        for pname, product in products.items():
+            tiers = _product_tiers(
+                pname,
+                product,
+                keep_flags[pname],
+                meta.get(pname, {}),
+                chosen_date,
+                is_advertiser,
+                interactive_map_quarters,
+            )
+            tiers = [(o, l, b, _to_cents(line)) for o, l, b, line in tiers]
+            product_slice[pname] = slice(len(flat), len(flat) + len(tiers))
+            min_step[pname] = min(
+                (b[3] - a[3] for a, b in zip(tiers, tiers[1:]) if b[3] > a[3]),
+                default=float("inf"),
+            )
+            flat.extend(tiers)
+
+        opt_names, labels, eff_bases, line_cents = (
+            tuple(col) for col in zip(*flat)
+        ) if flat else ((), (), (), ())
+
+        return cls(
+            product_slice=product_slice,
+            opt_names=opt_names,
+            labels=labels,
+            eff_bases=eff_bases,
+            line_cents=line_cents,
+            min_step=min_step,
+            is_map=tuple(pname == INTERACTIVE_MAP for pname in product_slice),
+        )
+
+
+# ------------------------------------------------------------
+# Core allocator — new Map handling added
+# ------------------------------------------------------------
+def greedy_fill_context(
+    budget: float,
+    ctx: PricingContext,
+) -> Tuple[Selection, bool]:
+    return _greedy_fill_cents(_budget_cents(budget), ctx)
 
-            picks[pname] = (opt_name, lbl, eff_base)
 
+def _greedy_fill_cents(
+    budget: int,
+    ctx: PricingContext,
+) -> Tuple[Selection, bool]:
+    """greedy_fill_context with the budget and all prices in cents."""
+    lines = ctx.line_cents
+    names = list(ctx.product_slice)
+    slices = [ctx.product_slice[p] for p in names]
+    # current tier index per product slot (-1: no pick); picks dict is
+    # only materialized on return
+    cur_idx: List[int] = [-1] * len(names)
+    subtotal = 0
+
+    # --------------------------------------------------------
+    # Baseline picks (select initial tier for each product)
+    # --------------------------------------------------------
+    for slot, (sl, is_map) in enumerate(zip(slices, ctx.is_map)):
+        i = _baseline_index(is_map, lines, sl.start, sl.stop, budget)
+        if i < 0:
+            continue
+
+        subtotal += lines[i]
+        cur_idx[slot] = i
+
+    picked = [slot for slot, i in enumerate(cur_idx) if i >= 0]
 
     # --------------------------------------------------------
-    # Upgrade loop — now Map upgrades use new pricing model
+    # Upgrade phase — round-robin, one tier step per turn
     # --------------------------------------------------------
     forced_overage = subtotal > budget
 
     if not forced_overage:
-        improved = True
+        # Upgrades only ever consume budget, so a product whose next tier
+        # does not fit now never will: drop it instead of re-scanning it.
+        # Re-queueing upgraded products at the back keeps the same order
+        # as repeated full sweeps over the picks.
+        queue = deque(picked)
+
+        # no upgrade anywhere can cost less than this
+        floor_step = min(
+            (ctx.min_step[names[slot]] for slot in picked), default=float("inf")
+        )
 
-        while improved:
-            improved = False
+        while queue:
+            if budget - subtotal < floor_step:
+                break
 
-            for pname, (cur_opt, cur_lbl, cur_base) in list(picks.items()):
-                product = products[pname]
+            slot = queue.popleft()
+            sl = slices[slot]
+            cur_line = lines[cur_idx[slot]]
 
-                # current cost
-                map_price = map_line_price(
-                    pname, cur_lbl, cur_base, interactive_map_quarters
-                )
-                if map_price is not None:
-                    cur_line = map_price
-                else:
-                    cur_line = effective_line_price(product, cur_lbl, cur_base)
-
-                upgrades = []
-
-                # explore all other tiers
-                for opt in product.price_options:
-                    opt_name = opt.get("name", pname)
-
-                    # repeat booth advertiser logic
-                    if "summit" in pname.lower() and "booth" in pname.lower():
-                        low = opt_name.lower()
-                        has_non = ("non-advertiser" in low) or ("non advertiser" in low)
-                        has_adv = ("advertiser" in low) and (not has_non)
-
-                        if is_advertiser and has_non:
-                            continue
-                        if (not is_advertiser) and has_adv:
-                            continue
-
-                    for lbl, base_price in price_points(opt):
-                        if _is_restricted_tier(lbl, is_advertiser):
-                            continue
-
-                        eff_base = get_effective_unit_price(
-                            pname,
-                            opt_name,
-                            base_price,
-                            meta.get(pname, {}),
-                            chosen_date,
-                            is_advertiser=is_advertiser,
-                        )
-
-                        map_price = map_line_price(
-                            pname, lbl, eff_base, interactive_map_quarters
-                        )
-                        if map_price is not None:
-                            new_line = map_price
-                        else:
-                            new_line = effective_line_price(product, lbl, eff_base)
-
-                        # upgrades must be more expensive than current tier
-                        if new_line > cur_line:
-                            upgrades.append((opt_name, lbl, eff_base, new_line))
-
-                upgrades.sort(key=lambda x: x[3])  # ascending by cost
-
-                for opt_name, lbl, eff_base, new_line in upgrades:
-
-                    if subtotal - cur_line + new_line <= budget:
-                        subtotal = subtotal - cur_line + new_line
-                        picks[pname] = (opt_name, lbl, eff_base)
-                        improved = True
-                        break
-
-    return Selection(picks=picks, subtotal=round(subtotal, 2)), forced_overage
+            i = _best_upgrade(lines, sl.start, sl.stop, cur_line, subtotal, budget)
+            if i < 0:
+                continue
+
+            subtotal = subtotal - cur_line + lines[i]
+            cur_idx[slot] = i
+            queue.append(slot)
+
+    picks: Dict[str, Tuple[str, str, float]] = {
+        names[slot]: (
+            ctx.opt_names[cur_idx[slot]],
+            ctx.labels[cur_idx[slot]],
+            ctx.eff_bases[cur_idx[slot]],
+        )
+        for slot in picked
+    }
+
+    return Selection(picks=picks, subtotal=subtotal / 100), forced_overage
+
+
+def greedy_fill_to_cap(
+    budget: float,
+    products: Dict[str, ProductRecord],
+    meta: Dict[str, dict],
+    chosen_date: Optional[date],
+    is_advertiser: bool = False,
+    interactive_map_quarters: Optional[int] = None,
+) -> Tuple[Selection, bool]:
+    ctx = PricingContext.build(
+        products, meta, is_advertiser, chosen_date, interactive_map_quarters
+    )
+    return greedy_fill_context(budget, ctx)
 
 
 # ------------------------------------------------------------
@@ -1,8 +1,11 @@
 from __future__ import annotations
 import json
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import pandas as pd
 import streamlit as st
 
 from ateema.io_loader import load_products
@@ -10,7 +13,8 @@ from ateema.summit_rules import apply_summit_rules
 from ateema.catalog import partition_by_category
 from ateema.upgrader import run_fill_to_cap
 from ateema.formatting import format_product_block
-from ateema.pricing import apply_discounts, get_effective_unit_price, first_known_price
+from ateema.models import ProposalState
+from ateema.pricing import apply_discounts, attach_price_points, get_effective_unit_price
 
 BASE_DIR = Path(__file__).resolve()
 project_root = BASE_DIR.parent.parent
@@ -32,7 +36,11 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-if logo_wide_path.exists():
+# stat the logo once per session, not on every rerun
+if "_logo_exists" not in st.session_state:
+    st.session_state["_logo_exists"] = logo_wide_path.exists()
+
+if st.session_state["_logo_exists"]:
     # [1, 3, 1]  -> Logo will occupy 60% of the first row
     # [1, 2, 1]  -> Logo will occupy 50%...
     left_co, cent_co, last_co = st.columns([1, 2, 1])
@@ -42,10 +50,6 @@ if logo_wide_path.exists():
 else:
     st.title("Ateema – Proposal Builder")
 
-# ---------- Page ----------
-st.set_page_config(page_title="Ateema – Proposal Builder", page_icon="🧭", layout="wide")
-st.title("Ateema – Proposal Builder")
-
 # ---------- Sidebar (old layout restored) ----------
 
 DEFAULT_PRODUCTS = str(project_root / "Data" / "PriceStrategy")
@@ -68,50 +72,90 @@ soft_cap_pct = 10
 # ---------- Awards config (Gabby) ----------
 
 AWARDS_PATH = project_root / "Data" / "PriceStrategy" / "Summit Awards.json"
-try:
-    with AWARDS_PATH.open("r", encoding="utf-8") as f:
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_awards(path: str, mtime: float):
+    """
+    Parse the Summit awards config once per process (Streamlit re-runs the
+    whole script on every interaction); mtime only keys the cache, so an
+    edited file is picked up without a restart.
+
+    Returns (config, general_categories, business_type_to_award,
+    award_name_to_price, award_name_to_description, warning).
+    """
+    with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    warning = None
     # 如果是我们刚才包过壳的形式：{ ..., "awards": [ ... ] }
     if isinstance(data, dict) and "awards" in data:
-        AWARDS_CONFIG = data["awards"]
+        config = data["awards"]
     # 如果还是原来的 list（以防以后同学忘了加壳）
     elif isinstance(data, list):
-        AWARDS_CONFIG = data
+        config = data
     else:
-        AWARDS_CONFIG = []
-        st.warning("Summit awards config has unexpected format.")
+        config = []
+        warning = "Summit awards config has unexpected format."
 
     # 所有 general_category，用于 Business Type 下拉框
-    GENERAL_AWARD_CATEGORIES = sorted(
-        {a.get("general_category") for a in AWARDS_CONFIG if a.get("general_category")}
-    )
+    categories: set[str] = set()
 
-    # Business type / general_category → Award 名
-    BUSINESS_TYPE_TO_AWARD: dict[str, str] = {}
+    # Business type / general_category → Award 名 (first award wins)
+    business_type_to_award: dict[str, str] = {}
 
     # Award 名 → 价格 / 描述
-    AWARD_NAME_TO_PRICE: dict[str, float] = {}
-    AWARD_NAME_TO_DESCRIPTION: dict[str, str] = {}
-
-    for a in AWARDS_CONFIG:
-        name = a.get("name")
-        gen_cat = a.get("general_category")
-        price = a.get("price")
-        desc = a.get("description")
-        eligible_types = a.get("eligible_business_types") or []
-
-        if gen_cat and name and gen_cat not in BUSINESS_TYPE_TO_AWARD:
-            BUSINESS_TYPE_TO_AWARD[gen_cat] = name
+    award_name_to_price: dict[str, float] = {}
+    award_name_to_description: dict[str, str] = {}
+
+    for a in config:
+        get = a.get
+        name = get("name")
+        gen_cat = get("general_category")
+        price = get("price")
+        desc = get("description")
+
+        if gen_cat:
+            categories.add(gen_cat)
+
+        if name is None:
+            continue
+
+        if name:
+            if gen_cat:
+                business_type_to_award.setdefault(gen_cat, name)
+            for bt in get("eligible_business_types") or ():
+                if bt:
+                    business_type_to_award.setdefault(bt, name)
+
+        if price is not None:
+            award_name_to_price[name] = float(price)
+        if desc:
+            award_name_to_description[name] = desc
+
+    general_categories = sorted(categories)
+
+    return (
+        config,
+        general_categories,
+        business_type_to_award,
+        award_name_to_price,
+        award_name_to_description,
+        warning,
+    )
 
-        for bt in eligible_types:
-            if bt and name and bt not in BUSINESS_TYPE_TO_AWARD:
-                BUSINESS_TYPE_TO_AWARD[bt] = name
 
-        if name is not None and price is not None:
-            AWARD_NAME_TO_PRICE[name] = float(price)
-        if name is not None and desc:
-            AWARD_NAME_TO_DESCRIPTION[name] = desc
+try:
+    (
+        AWARDS_CONFIG,
+        GENERAL_AWARD_CATEGORIES,
+        BUSINESS_TYPE_TO_AWARD,
+        AWARD_NAME_TO_PRICE,
+        AWARD_NAME_TO_DESCRIPTION,
+        _awards_warning,
+    ) = _load_awards(str(AWARDS_PATH), AWARDS_PATH.stat().st_mtime)
+    if _awards_warning:
+        st.warning(_awards_warning)
 
 except Exception as e:
     AWARDS_CONFIG = []
@@ -125,50 +169,107 @@ if "proposal_state" not in st.session_state:
     st.session_state["proposal_state"] = None  # store last generated selections
 
 if "price_overrides" not in st.session_state:
-    # key -> new_total_price
+    # (pool, product, option) -> new_total_price
     st.session_state["price_overrides"] = {}
 
 if "override_open" not in st.session_state:
     st.session_state["override_open"] = False
 
 
-def _row_key(pool_label: str, row: dict) -> str:
+def _row_key(pool_label: str, row: dict) -> Tuple[str, str, str]:
     # pool_label: "tourist" / "industry"
-    return f"{pool_label}|{row.get('product', '')}|{row.get('option', '')}"
+    return (pool_label, row.get("product", ""), row.get("option", ""))
 
 
-def _apply_price_overrides(pool_label: str, rows: list[dict]) -> list[dict]:
-    """Mutate a copy of rows by applying user overrides to total_price (and unit_price)."""
-    overrides: dict = st.session_state.get("price_overrides", {}) or {}
+def _apply_price_overrides(pool_label: str, rows: list[dict], overrides: dict) -> list[dict]:
+    """Apply user overrides to total_price (and unit_price); overridden rows are copied, others shared."""
+    if not overrides:
+        # common case: nothing overridden, callers never mutate the result
+        return rows
+
     out = []
     for r in rows:
+        key = _row_key(pool_label, r)
+        if key not in overrides:
+            out.append(r)
+            continue
         rr = dict(r)
-        key = _row_key(pool_label, rr)
-        if key in overrides:
-            new_total = float(overrides[key])
-            qty = float(rr.get("qty") or 1) or 1.0
-            rr["total_price"] = new_total
-            rr["unit_price"] = new_total / qty
-            # mark in notes
-            note = rr.get("discount") or ""
-            tag = "Price override"
-            rr["discount"] = (note + (" | " if note else "") + tag)
+        new_total = float(overrides[key])
+        qty = float(rr.get("qty") or 1) or 1.0
+        rr["total_price"] = new_total
+        rr["unit_price"] = new_total / qty
+        # mark in notes
+        note = rr.get("discount") or ""
+        tag = "Price override"
+        rr["discount"] = (note + (" | " if note else "") + tag)
         out.append(rr)
     return out
 
 
 # ---------- Utils ----------
+# "3x" / " 12 X " style tiers; surrounding whitespace is matched instead of stripped
+_QTY_RE = re.compile(r"\s*(\d+)\s*[xX]\s*")
+# profile lines parsed in "Load JSON" mode
+_FOCUS_RE = re.compile(r"Focus:\s*(.*)", re.IGNORECASE)
+_TARGET_RE = re.compile(r"Market Target:\s*(.*)", re.IGNORECASE)
+_AUDIENCE_RE = re.compile(r"Audience Type:\s*(.*)", re.IGNORECASE)
+# separators between audience types ("Tourist, Local and ...")
+_AUDIENCE_SPLIT_RE = re.compile(r",|/|&|and")
+
+
 def list_jsons(folder: Path) -> List[str]:
+    # scandir entries carry the file type, so no extra stat per file
     try:
-        return sorted([str(p) for p in folder.glob("*.json")])
-    except Exception:
+        with os.scandir(folder) as it:
+            return sorted(
+                e.path for e in it if e.name.endswith(".json") and e.is_file()
+            )
+    except OSError:
         return []
 
 
+@st.cache_data(show_spinner=False)
+def _cached_list_jsons(folder_str: str, dir_mtime_ns: int) -> List[str]:
+    # adding/removing/renaming a file bumps the folder mtime; edits don't
+    # change the listing
+    return list_jsons(Path(folder_str))
+
+
+def _folder_signature(paths: List[str]) -> tuple:
+    """(name, mtime_ns) per product file — changes whenever a file does."""
+    sig = []
+    for p in paths:
+        try:
+            sig.append((p, os.stat(p).st_mtime_ns))
+        except OSError:
+            sig.append((p, None))
+    return tuple(sig)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _cached_load_products(folder_str: str, signature: tuple):
+    """
+    (catalog, meta) shared by every session and rerun; treat
+    them as read-only. signature only keys the cache, so edited files reload.
+    The one write, attaching each option's price points, happens here
+    before the load is shared.
+    """
+    catalog, meta = load_products(Path(folder_str))
+
+    # Gabri Award
+    for internal_name in ["Summit Awards Config", "Summit Awards"]:
+        catalog.pop(internal_name, None)
+        meta.pop(internal_name, None)
+
+    attach_price_points(catalog)
+    return catalog, meta
+
+
+@lru_cache(maxsize=256)
 def qty_from_tier(tier: str) -> int:
     if not tier:
         return 1
-    m = re.fullmatch(r"(\d+)\s*[xX]", tier.strip())
+    m = _QTY_RE.fullmatch(tier)
     return int(m.group(1)) if m else 1
 
 
@@ -190,6 +291,19 @@ def make_reasoning(
     strategy = info.get("sales_strategy", "")
     notes = info.get("option_notes", {}).get(option, "")
 
+    return _reasoning_cached(focus, market_target, notes, desc, strategy)
+
+
+@lru_cache(maxsize=2048)
+def _reasoning_cached(
+        focus: str,
+        market_target: str,
+        notes: str,
+        desc: str,
+        strategy: str,
+) -> str:
+    # Pure function of its text inputs, so reruns triggered by unrelated
+    # widgets reuse the joined reasoning instead of re-splitting clauses.
     bullets = []
 
     # 1) Focus + Target — compressed to short phrase
@@ -243,6 +357,9 @@ def rows_from_selection(
     """
     out: List[Dict] = []
 
+    # |all_products - {prod}| > 0, without building the difference per row
+    n_products = len(all_products)
+
     for prod, (opt_name, tier, unit_price_original) in sel.picks.items():
 
         # Base qty from tier
@@ -252,20 +369,14 @@ def rows_from_selection(
         if prod == "Chicago Does Interactive Map":
             qty = st.session_state.get("interactive_map_quarters", qty)
 
-        has_other_products = len(all_products - {prod}) > 0
+        has_other_products = n_products > (prod in all_products)
 
         # Dazhou 11/24 grand total
         # Force is_advertiser=False, then try to find the original price from META
         product_info = meta.get(prod, {})
-        raw_base = unit_price_original  # 默认回退值
-        # Try to find original product price from META
-        if "price_options" in product_info:
-            for opt in product_info["price_options"]:
-                if opt.get("name", prod) == opt_name:
-                    found_base = first_known_price(opt)
-                    if found_base is not None:
-                        raw_base = found_base
-                    break
+        # META carries no price_options (see load_products), so the list price
+        # starts from the allocator's unit price
+        raw_base = unit_price_original
 
         # Calculate real original price based on the seasonal price, forcing is_advertiser = false
         real_list_price = get_effective_unit_price(
@@ -325,15 +436,17 @@ def rows_from_selection(
 
     for idx, row in enumerate(out):
         pname = (row.get("product") or "").lower()
-        opt = (row.get("option") or "").lower()
+        # most rows are not the Networking Event: skip the host checks
+        if "network" not in pname or "event" not in pname:
+            continue
 
-        is_network = ("network" in pname and "event" in pname)
+        opt = (row.get("option") or "").lower()
 
         # HOST 的判定：优先看 option/name 里包含 host；兜底用 3500 原价识别（兼容旧输出）
         unit_orig = float(row.get("unit_price_original") or 0.0)
         is_host = ("host" in opt) or abs(unit_orig - 3500.0) < 1e-6
 
-        if is_network and is_host:
+        if is_host:
             host_indices.append(idx)
             host_total += float(row.get("total_price") or 0.0)
 
@@ -363,7 +476,7 @@ if not folder.exists():
     st.error(f"Folder not found: {products_path}")
     st.stop()
 
-found = list_jsons(folder)
+found = _cached_list_jsons(str(folder), folder.stat().st_mtime_ns)
 if not found:
     st.warning("No *.json files found in the selected folder.")
 else:
@@ -374,10 +487,12 @@ else:
 catalog = {}
 meta = {}
 try:
-    catalog, meta = load_products(folder)
+    catalog, meta = _cached_load_products(
+        str(folder), _folder_signature(found)
+    )
 except Exception as e:
     bad = None
-    for p in folder.glob("*.json"):
+    for p in found:
         try:
             _ = json.loads(Path(p).read_text(encoding="utf-8"))
         except Exception as sub_e:
@@ -389,17 +504,16 @@ except Exception as e:
         st.error(f"Failed to load products: {e}")
     st.stop()
 
-# Gabri Award
-for internal_name in ["Summit Awards Config", "Summit Awards"]:
-    catalog.pop(internal_name, None)
-    meta.pop(internal_name, None)
-
 raw_names = sorted(catalog.keys())
 
 # Gabri Award
 all_names = raw_names
 
 # ---------- Input areas ----------
+AUDIENCE_OPTIONS = ["Tourist", "Local", "Meeting and Event Planner"]
+# Gabri Award
+AWARD_PRODUCT_NAME = "Summit — Awards Sponsorship"
+
 profile_text = ""
 focus_text = ""
 market_text = ""
@@ -423,9 +537,9 @@ if input_mode == "Load JSON":
         chosen = list(raw.get("candidate_products", []))
 
         # Extract focus/target/audience from profile for reasoning
-        focus_match = re.search(r"Focus:\s*(.*)", profile, re.IGNORECASE)
-        target_match = re.search(r"Market Target:\s*(.*)", profile, re.IGNORECASE)
-        audience_match = re.search(r"Audience Type:\s*(.*)", profile, re.IGNORECASE)
+        focus_match = _FOCUS_RE.search(profile)
+        target_match = _TARGET_RE.search(profile)
+        audience_match = _AUDIENCE_RE.search(profile)
 
         focus_text = focus_match.group(1).strip() if focus_match else ""
         market_text = target_match.group(1).strip() if target_match else ""
@@ -466,8 +580,6 @@ else:
         st.info("No Summit Award automatically matched for this business type.")
 
     # 支持多选的 Audience Type
-    AUDIENCE_OPTIONS = ["Tourist", "Local", "Meeting and Event Planner"]
-
     audience_types = st.multiselect(
         "Audience Type (you can choose one or more)",
         options=AUDIENCE_OPTIONS,
@@ -518,8 +630,6 @@ else:
         help="If checked, Interactive Map pricing will reflect a 10% prepay discount where applicable."
     )
     # --- Similar clients (auto-generate) ---
-    # Gabri Award
-    AWARD_PRODUCT_NAME = "Summit — Awards Sponsorship"
     # All Award Options
     extended_options = all_names + [AWARD_PRODUCT_NAME]
 
@@ -530,8 +640,6 @@ else:
     if st.button("Generate similar clients", type="secondary"):
         try:
             with st.spinner("Analyzing similar clients..."):
-                from partner.client_to_product_final import similar_clients_json
-
                 new_client_payload = {
                     "Business Name": client_name,
                     "Business Type": business_type,
@@ -539,7 +647,16 @@ else:
                     "Market Target": market_text,
                     "Business Description": "",
                 }
-                sc = similar_clients_json(new_client_payload, k=k_sim)
+
+                # same survey + k -> same neighbours; skip the embedding search
+                sim_cache = st.session_state.setdefault("_similar_cache", {})
+                sim_key = (tuple(new_client_payload.items()), k_sim)
+                sc = sim_cache.get(sim_key)
+                if sc is None:
+                    from partner.client_to_product_final import similar_clients_json
+
+                    sc = similar_clients_json(new_client_payload, k=k_sim)
+                    sim_cache[sim_key] = sc
 
                 st.session_state["_payload_similar"] = sc["similar_clients"]
                 st.rerun()
@@ -607,7 +724,51 @@ else:
 
 # ---------- Output helpers ----------
 # Gabri多选audience recommendation函数
-import re  # 顶部如果已经有就不用重复
+
+# ---------------------------
+# SALES-FRIENDLY NOTES (new tone)
+# ---------------------------
+_SALES_NOTES = {
+    "Tourism": (
+        "Tourists rely heavily on digital search, maps, and recommendations "
+        "when deciding where to eat, shop, and explore. Digital ads help your "
+        "business stay visible during these key decision moments, ensuring "
+        "visitors can easily discover you while comparing nearby options."
+    ),
+    "Local": (
+        "Local customers make quick decisions about where to dine, meet friends, "
+        "or try something new. Consistent digital visibility keeps your business "
+        "top-of-mind, helping you become a go-to choice for people living and "
+        "working nearby."
+    ),
+    "Meeting": (
+        "Meeting and Event Planners search for reliable, high-quality partners "
+        "when planning group activities or corporate events. Digital ads keep "
+        "your business visible early in their planning process, helping you "
+        "stand out when they compare venues and build itineraries."
+    ),
+}
+
+# ---------------------------
+# Multi-audience segments (sales tone)
+# ---------------------------
+_SEGMENT_TEXT = {
+    "tourism": (
+        "Visitors rely on search engines, maps, and recommendation platforms "
+        "to decide where to go. Keeping your business visible ensures tourists "
+        "can easily discover you as they plan their day and compare nearby options."
+    ),
+    "local": (
+        "Locals look for dependable, convenient places to visit regularly. "
+        "Digital visibility helps your business stay top-of-mind and become "
+        "part of their routine dining, shopping, and entertainment decisions."
+    ),
+    "meeting": (
+        "Planners often make high-value decisions, booking for groups or corporate "
+        "activities. Staying visible during their early research phase helps your "
+        "business stand out as they evaluate venues and create customized itineraries."
+    ),
+}
 
 
 def make_digital_ads_paragraph(
@@ -620,19 +781,22 @@ def make_digital_ads_paragraph(
     Generate the Digital Advertising Recommendation section
     with a sales-friendly tone suitable for Ateema's clients.
     """
+    # The text only depends on the survey answers (the digital_ads meta
+    # entry is not used), so reruns with unchanged answers hit the cache.
+    return _digital_ads_paragraph_cached(audience_type_text, focus_text, market_text)
 
-    # ---------------------------
-    # Load meta data
-    # ---------------------------
-    digi_meta = meta.get("digital_ads") or {}
-    notes_map = digi_meta.get("notes_map") or {}
-    product_desc = digi_meta.get("product_description") or ""
 
+@lru_cache(maxsize=128)
+def _digital_ads_paragraph_cached(
+        audience_type_text: str,
+        focus_text: str,
+        market_text: str,
+) -> str:
     # ---------------------------
     # Normalize audience list
     # ---------------------------
     raw = audience_type_text or ""
-    tokens = [t.strip() for t in re.split(r",|/|&|and", raw) if t.strip()]
+    tokens = [t.strip() for t in _AUDIENCE_SPLIT_RE.split(raw) if t.strip()]
 
     audience_types: list[str] = []
     seen = set()
@@ -653,51 +817,6 @@ def make_digital_ads_paragraph(
     if not audience_types and not (focus_text or market_text):
         return ""
 
-    # ---------------------------
-    # SALES-FRIENDLY NOTES (new tone)
-    # ---------------------------
-    SALES_NOTES = {
-        "Tourism": (
-            "Tourists rely heavily on digital search, maps, and recommendations "
-            "when deciding where to eat, shop, and explore. Digital ads help your "
-            "business stay visible during these key decision moments, ensuring "
-            "visitors can easily discover you while comparing nearby options."
-        ),
-        "Local": (
-            "Local customers make quick decisions about where to dine, meet friends, "
-            "or try something new. Consistent digital visibility keeps your business "
-            "top-of-mind, helping you become a go-to choice for people living and "
-            "working nearby."
-        ),
-        "Meeting": (
-            "Meeting and Event Planners search for reliable, high-quality partners "
-            "when planning group activities or corporate events. Digital ads keep "
-            "your business visible early in their planning process, helping you "
-            "stand out when they compare venues and build itineraries."
-        ),
-    }
-
-    # ---------------------------
-    # Multi-audience segments (sales tone)
-    # ---------------------------
-    SEGMENT_TEXT = {
-        "tourism": (
-            "Visitors rely on search engines, maps, and recommendation platforms "
-            "to decide where to go. Keeping your business visible ensures tourists "
-            "can easily discover you as they plan their day and compare nearby options."
-        ),
-        "local": (
-            "Locals look for dependable, convenient places to visit regularly. "
-            "Digital visibility helps your business stay top-of-mind and become "
-            "part of their routine dining, shopping, and entertainment decisions."
-        ),
-        "meeting": (
-            "Planners often make high-value decisions, booking for groups or corporate "
-            "activities. Staying visible during their early research phase helps your "
-            "business stand out as they evaluate venues and create customized itineraries."
-        ),
-    }
-
     # ---------------------------
     # Start composing output
     # ---------------------------
@@ -721,11 +840,11 @@ def make_digital_ads_paragraph(
 
         # Identify note
         if "meeting" in at_low:
-            parts.append(SALES_NOTES["Meeting"])
+            parts.append(_SALES_NOTES["Meeting"])
         elif "tour" in at_low:
-            parts.append(SALES_NOTES["Tourism"])
+            parts.append(_SALES_NOTES["Tourism"])
         else:
-            parts.append(SALES_NOTES["Local"])
+            parts.append(_SALES_NOTES["Local"])
 
     # ---------------------------
     # MULTIPLE AUDIENCES → summary + segments
@@ -766,7 +885,7 @@ def make_digital_ads_paragraph(
                 "Local Customers"
             )
 
-            parts.append(f"**{label}**\n\n{SEGMENT_TEXT[seg]}")
+            parts.append(f"**{label}**\n\n{_SEGMENT_TEXT[seg]}")
 
     # ---------------------------
     # Focus + Market (sales tone)
@@ -786,142 +905,164 @@ def make_digital_ads_paragraph(
     return "\n\n".join(parts)
 
 
-# Dazhou 11/17 Advertiser
-def _render_table(label: str, sel, all_products: set[str], prepay_full_year: bool, is_advertiser: bool,
-                  grand_total: float | None = None,
-                  include_award: bool = False):  # Gabri Award# Dazhou 11/17 Advertiser # Yuchen 11/19 Early Bird # Yuchen 11/20 Networking Event
-    import pandas as pd
+# Column layout for the pool tables; emitted once per run, before both tables.
+_TABLE_CSS = """
+    <style>
+    table { table-layout: fixed; width: 100%; border-collapse: collapse; }
+    thead th { font-weight: 700; font-size: 16px !important; text-align: left; padding: 6px; }
+    td { white-space: normal !important; word-wrap: break-word !important; font-size: 15px; vertical-align: top; padding: 6px; }
 
-    rows = rows_from_selection(
-        label=label,
-        sel=sel,
-        focus=focus_text,
-        market_target=market_text,
-        all_products=all_products,
-        prepay_full_year=prepay_full_year,
-        is_advertiser=is_advertiser,  # Dazhou 11/17 Advertiser
-        proposal_date=proposal_date,  # Yuchen 11/19 Early Bird
-        grand_total=grand_total,  # Yuchen 11/20 Networking Event
-    )
-    # Gabri Award
-    # ---------- Insert Award begin ----------
-    award_extra_total = 0.0
-    # Award only in industry pool
-    if label == "industry" and matched_award and include_award:
-        award_price = AWARD_NAME_TO_PRICE.get(matched_award, 0.0)
-        award_desc = AWARD_NAME_TO_DESCRIPTION.get(
-            matched_award,
-            f"Includes recognition in {matched_award}, aligned with your business type and the Summit Awards program.",
-        )
+    /* --- 适配 Index 列的宽度分配 (共 10 列) --- */
 
-        award_row = {
-            "product": "Summit — Awards Sponsorship",
-            "option": matched_award,
-            "qty": 1,
-            "unit_price_original": award_price,
-            "unit_price": award_price,
-            "discount": "",
-            "total_price_original": award_price,
-            "total_price": award_price,
-            "reasoning": award_desc,
-        }
-        already = any(
-            r.get("product") == award_row["product"]
-            and r.get("option") == award_row["option"]
-            for r in rows
-        )
-        if not already:
-            rows.append(award_row)
-            award_extra_total += award_price
+    /* Col 1: Index (新增 - 极窄，灰色字体) */
+    th:nth-child(1), td:nth-child(1) { width: 4%; color: #888; text-align: center; }
 
-    # ---------- Insert Award End ----------
+    /* Col 2: Product (11%) */
+    th:nth-child(2), td:nth-child(2) { width: 11%; }
 
-    # ✅ apply overrides AFTER all auto-insert logic (award / free network, etc.) Yuchen 11.30
-    rows = _apply_price_overrides(label, rows)
+    /* Col 3: Option (12%) */
+    th:nth-child(3), td:nth-child(3) { width: 12%; }
 
-    # Dazhou 11/26 ambassador bug fix
-    current_table_total = 0.0
+    /* Col 4: Qty (4%) */
+    th:nth-child(4), td:nth-child(4) { width: 4%; text-align: center; }
 
-    # Dazhou 11/26 Subtotal price fix
-    if rows:
-        # Calculate the subtotal price on here
-        current_table_total = sum(r["total_price"] for r in rows)
-        st.write(f"**Subtotal:** ${current_table_total:,.2f}")
-
-    if rows:
-        df = pd.DataFrame(
-            rows,
-            columns=[
-                "product",
-                "option",
-                "qty",
-                "unit_price_original",
-                "unit_price",
-                "discount",
-                "total_price_original",
-                "total_price",
-                "reasoning",
-            ],
-        )
+    /* Col 5 & 6: 单价 (7.5% each) */
+    th:nth-child(5), td:nth-child(5) { width: 7.5%; }
+    th:nth-child(6), td:nth-child(6) { width: 7.5%; }
 
-        current_table_total = df["total_price"].sum()
-
-        df.index = df.index + 1
-        # Dazohu 11/24 grand total
-        df = df.rename(columns={
-            "product": "Product",
-            "option": "Option",
-            "qty": "Qty",
-            "unit_price_original": "Unit Original Price",
-            "unit_price": "Price",
-            "discount": "Discount / Notes",
-            "total_price_original": "Total Original",
-            "total_price": "Total Price",
-            "reasoning": "Reasoning"
-        })
+    /* Col 7: Discount (9%) */
+    th:nth-child(7), td:nth-child(7) { width: 9%; }
 
-        st.markdown(
-            """
-            <style>
-            table { table-layout: fixed; width: 100%; border-collapse: collapse; }
-            thead th { font-weight: 700; font-size: 16px !important; text-align: left; padding: 6px; }
-            td { white-space: normal !important; word-wrap: break-word !important; font-size: 15px; vertical-align: top; padding: 6px; }
+    /* Col 8 & 9: 总价 (7.5% each) */
+    th:nth-child(8), td:nth-child(8) { width: 7.5%; }
+    th:nth-child(9), td:nth-child(9) { width: 7.5%; }
+
+    /* Col 10: Reasoning (最后一列 - 剩余约 25%) */
+    th:nth-child(10), td:nth-child(10) { width: 30%; }
+
+    </style>
+    """
 
-            /* --- 适配 Index 列的宽度分配 (共 10 列) --- */
 
-            /* Col 1: Index (新增 - 极窄，灰色字体) */
-            th:nth-child(1), td:nth-child(1) { width: 4%; color: #888; text-align: center; }
+def _pool_rows(label: str, sel, all_products: set[str], prepay_full_year: bool, is_advertiser: bool,
+               grand_total: float | None = None) -> List[Dict]:
+    """
+    rows_from_selection, memoized in session_state per pool.
 
-            /* Col 2: Product (11%) */
-            th:nth-child(2), td:nth-child(2) { width: 11%; }
+    Reruns that only touch an override (or any unrelated widget) hit the memo;
+    anything that feeds rows_from_selection is part of the key. Returns a new
+    list each call, since callers append the award row.
+    """
+    key = (
+        tuple(sel.picks.items()),
+        focus_text,
+        market_text,
+        frozenset(all_products),
+        prepay_full_year,
+        is_advertiser,
+        proposal_date,
+        grand_total,
+        st.session_state.get("interactive_map_quarters"),
+        id(meta),
+    )
+    memo = st.session_state.setdefault("_pool_rows_memo", {})
+    hit = memo.get(label)
+    if hit is None or hit[0] != key:
+        rows = rows_from_selection(
+            label=label,
+            sel=sel,
+            focus=focus_text,
+            market_target=market_text,
+            all_products=all_products,
+            prepay_full_year=prepay_full_year,
+            is_advertiser=is_advertiser,  # Dazhou 11/17 Advertiser
+            proposal_date=proposal_date,  # Yuchen 11/19 Early Bird
+            grand_total=grand_total,  # Yuchen 11/20 Networking Event
+        )
+        hit = memo[label] = (key, rows)
+    return list(hit[1])
 
-            /* Col 3: Option (12%) */
-            th:nth-child(3), td:nth-child(3) { width: 12%; }
 
-            /* Col 4: Qty (4%) */
-            th:nth-child(4), td:nth-child(4) { width: 4%; text-align: center; }
+def _append_award_row(rows: List[Dict], award: str) -> None:
+    """Add the Summit award line to an industry pool's rows unless it is already there."""
+    # one scan per call; a (product, option) set would cost the same single pass
+    for r in rows:
+        if r.get("product") == AWARD_PRODUCT_NAME and r.get("option") == award:
+            return
+
+    award_price = AWARD_NAME_TO_PRICE.get(award, 0.0)
+    rows.append({
+        "product": AWARD_PRODUCT_NAME,
+        "option": award,
+        "qty": 1,
+        "unit_price_original": award_price,
+        "unit_price": award_price,
+        "discount": "",
+        "total_price_original": award_price,
+        "total_price": award_price,
+        "reasoning": AWARD_NAME_TO_DESCRIPTION.get(
+            award,
+            f"Includes recognition in {award}, aligned with your business type and the Summit Awards program.",
+        ),
+    })
 
-            /* Col 5 & 6: 单价 (7.5% each) */
-            th:nth-child(5), td:nth-child(5) { width: 7.5%; }
-            th:nth-child(6), td:nth-child(6) { width: 7.5%; }
 
-            /* Col 7: Discount (9%) */
-            th:nth-child(7), td:nth-child(7) { width: 9%; }
+# Dazhou 11/17 Advertiser
+def _render_table(label: str, sel, all_products: set[str], prepay_full_year: bool, is_advertiser: bool,
+                  grand_total: float | None = None,
+                  include_award: bool = False):  # Gabri Award# Dazhou 11/17 Advertiser # Yuchen 11/19 Early Bird # Yuchen 11/20 Networking Event
+    rows = _pool_rows(label, sel, all_products, prepay_full_year, is_advertiser, grand_total)
+    # Gabri Award
+    # ---------- Insert Award begin ----------
+    # Award only in industry pool
+    if label == "industry" and matched_award and include_award:
+        _append_award_row(rows, matched_award)
 
-            /* Col 8 & 9: 总价 (7.5% each) */
-            th:nth-child(8), td:nth-child(8) { width: 7.5%; }
-            th:nth-child(9), td:nth-child(9) { width: 7.5%; }
+    # ---------- Insert Award End ----------
 
-            /* Col 10: Reasoning (最后一列 - 剩余约 25%) */
-            th:nth-child(10), td:nth-child(10) { width: 30%; }
+    # ✅ apply overrides AFTER all auto-insert logic (award / free network, etc.) Yuchen 11.30
+    rows = _apply_price_overrides(label, rows, st.session_state.get("price_overrides") or {})
 
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
-        st.table(df)
-    else:
+    if not rows:
         st.info("No items selected.")
+        # Dazhou 11/26 ambassador bug fix
+        return 0.0
+
+    df = pd.DataFrame(
+        rows,
+        columns=[
+            "product",
+            "option",
+            "qty",
+            "unit_price_original",
+            "unit_price",
+            "discount",
+            "total_price_original",
+            "total_price",
+            "reasoning",
+        ],
+    )
+
+    # Dazhou 11/26 Subtotal price fix
+    # one column sum; plain float so the grand total is not a numpy scalar
+    current_table_total = float(df["total_price"].sum())
+    st.write(f"**Subtotal:** ${current_table_total:,.2f}")
+
+    df.index = df.index + 1
+    # Dazohu 11/24 grand total
+    df = df.rename(columns={
+        "product": "Product",
+        "option": "Option",
+        "qty": "Qty",
+        "unit_price_original": "Unit Original Price",
+        "unit_price": "Price",
+        "discount": "Discount / Notes",
+        "total_price_original": "Total Original",
+        "total_price": "Total Price",
+        "reasoning": "Reasoning"
+    })
+
+    st.table(df)
     # Dazhou 11/26 ambassador bug fix
     return current_table_total
 
@@ -929,6 +1070,7 @@ def _render_table(label: str, sel, all_products: set[str], prepay_full_year: boo
 # ---------- Generation (compute only) ----------
 if st.session_state.get("_trigger_generate"):
     st.session_state["_trigger_generate"] = False
+    st.session_state.pop("_pool_rows_memo", None)
     award_selected = st.session_state.get("_award_selected", False)
 
     if not chosen:
@@ -938,43 +1080,46 @@ if st.session_state.get("_trigger_generate"):
     subset = {k: catalog[k] for k in chosen if k in catalog}
     subset = apply_summit_rules(subset, profile_text=profile_text, is_advertiser=is_advertiser)
 
-    t_set, i_set = partition_by_category(subset, {k: meta.get(k, {}) for k in subset.keys()})
+    sub_meta = {k: meta.get(k, {}) for k in subset}
+
+    t_set, i_set = partition_by_category(subset, sub_meta)
 
     t_sel, i_sel, grand_total, warning_msg = run_fill_to_cap(
-        total_budget, tourist_pct, industry_pct, t_set, i_set, meta, proposal_date,
+        total_budget, tourist_pct, industry_pct, t_set, i_set, sub_meta, proposal_date,
         is_advertiser=is_advertiser,
         interactive_map_quarters=st.session_state.get("interactive_map_quarters", 1),
     )
 
-    all_products = set(t_sel.picks.keys()) | set(i_sel.picks.keys())
+    # dict views union directly; frozenset so _pool_rows can key on it as-is
+    all_products = frozenset(t_sel.picks.keys() | i_sel.picks.keys())
 
-    st.session_state["proposal_state"] = {
-        "t_sel": t_sel,
-        "i_sel": i_sel,
-        "grand_total": grand_total,
-        "warning_msg": warning_msg,
-        "all_products": all_products,
-        "subset": subset,
-        "award_selected": award_selected,
-    }
+    st.session_state["proposal_state"] = ProposalState(
+        t_sel=t_sel,
+        i_sel=i_sel,
+        grand_total=grand_total,
+        warning_msg=warning_msg,
+        all_products=all_products,
+        award_selected=award_selected,
+        input_preview=format_product_block(subset, sub_meta),
+    )
 
 # ---------- Render (always) ----------
 state = st.session_state.get("proposal_state")
 if state:
-    t_sel = state["t_sel"]
-    i_sel = state["i_sel"]
-    grand_total = state["grand_total"]
-    warning_msg = state["warning_msg"]
-    all_products = state["all_products"]
-    subset = state["subset"]
-    award_selected = state["award_selected"]
+    t_sel = state.t_sel
+    i_sel = state.i_sel
+    grand_total = state.grand_total
+    warning_msg = state.warning_msg
+    all_products = state.all_products
+    award_selected = state.award_selected
 
     # --- 下面把你原来的渲染整段粘进来 ---
+    st.markdown(_TABLE_CSS, unsafe_allow_html=True)
+
     st.subheader("Tourist Pool")
     t_real_total = _render_table("tourist", t_sel, all_products, prepay_full_year, is_advertiser, grand_total,
                                  award_selected)
     st.markdown("---")
-    st.markdown("---")
 
     st.subheader("Industry Pool")
     i_real_total = _render_table("industry", i_sel, all_products, prepay_full_year, is_advertiser, grand_total,
@@ -995,7 +1140,7 @@ if state:
             st.session_state["override_open"] = True
 
     with st.expander("Allocator input preview"):
-        st.code(format_product_block(subset, {k: meta.get(k, {}) for k in subset.keys()}))
+        st.code(state.input_preview)
 
     try:
         digi_text = make_digital_ads_paragraph(audience_type_text, focus_text, market_text, meta)
@@ -1007,61 +1152,21 @@ if state:
 
 # ---------- Price Override UI ----------
 if st.session_state.get("override_open") and state:
-    import pandas as pd
-
-    t_sel = state["t_sel"]
-    i_sel = state["i_sel"]
-    grand_total = state["grand_total"]
-    all_products = state["all_products"]
-    award_selected = state["award_selected"]
+    t_sel = state.t_sel
+    i_sel = state.i_sel
+    grand_total = state.grand_total
+    all_products = state.all_products
+    award_selected = state.award_selected
 
     # 1) rebuild rows (same source of truth as tables)
-    t_rows = rows_from_selection(
-        label="tourist",
-        sel=t_sel,
-        focus=focus_text,
-        market_target=market_text,
-        all_products=all_products,
-        prepay_full_year=prepay_full_year,
-        is_advertiser=is_advertiser,
-        proposal_date=proposal_date,
-        grand_total=grand_total,
-    )
-
-    i_rows = rows_from_selection(
-        label="industry",
-        sel=i_sel,
-        focus=focus_text,
-        market_target=market_text,
-        all_products=all_products,
-        prepay_full_year=prepay_full_year,
-        is_advertiser=is_advertiser,
-        proposal_date=proposal_date,
-        grand_total=grand_total,
-    )
+    t_rows = _pool_rows("tourist", t_sel, all_products, prepay_full_year, is_advertiser, grand_total)
+    i_rows = _pool_rows("industry", i_sel, all_products, prepay_full_year, is_advertiser, grand_total)
 
     # 2) keep award row consistent with _render_table
     if award_selected:  # label just to mirror logic
         try:
             if matched_award:
-                already = any(
-                    r.get("product") == "Summit — Awards Sponsorship"
-                    and r.get("option") == matched_award
-                    for r in i_rows
-                )
-                if not already:
-                    award_price = AWARD_NAME_TO_PRICE.get(matched_award, 0.0)
-                    i_rows.append({
-                        "product": "Summit — Awards Sponsorship",
-                        "option": matched_award,
-                        "qty": 1,
-                        "unit_price_original": award_price,
-                        "unit_price": award_price,
-                        "discount": "",
-                        "total_price_original": award_price,
-                        "total_price": award_price,
-                        "reasoning": AWARD_NAME_TO_DESCRIPTION.get(matched_award, ""),
-                    })
+                _append_award_row(i_rows, matched_award)
         except Exception:
             pass
 
@@ -1071,8 +1176,9 @@ if st.session_state.get("override_open") and state:
     i_base = i_rows
 
     # current (with override applied)
-    t_curr = _apply_price_overrides("tourist", t_base)
-    i_curr = _apply_price_overrides("industry", i_base)
+    overrides = st.session_state.get("price_overrides") or {}
+    t_curr = _apply_price_overrides("tourist", t_base, overrides)
+    i_curr = _apply_price_overrides("industry", i_base, overrides)
 
     # 4) build editor df
     rows = []
@@ -1081,32 +1187,36 @@ if st.session_state.get("override_open") and state:
         ("industry", i_base, i_curr),
     ]:
         # 用 key 对齐（防止顺序变）
-        base_map = {f"{pool}|{r.get('product', '')}|{r.get('option', '')}": r for r in base_list}
-        curr_map = {f"{pool}|{r.get('product', '')}|{r.get('option', '')}": r for r in curr_list}
+        base_map = {_row_key(pool, r): r for r in base_list}
+        # no overrides: _apply_price_overrides hands back the same list
+        curr_map = base_map if curr_list is base_list else {_row_key(pool, r): r for r in curr_list}
 
         for k, b in base_map.items():
-            c = curr_map.get(k, b)
+            current = curr_map.get(k, b).get("total_price") or 0.0
             rows.append({
                 "Pool": pool,
                 "Product": b.get("product", ""),
                 "Option": b.get("option", ""),
-                "Qty": float(b.get("qty") or 1),
-                "Base Total": float(b.get("total_price") or 0.0),
-                "Current Total": float(c.get("total_price") or 0.0),
-                "New Total": float(c.get("total_price") or 0.0),  # 默认=当前
+                "Qty": b.get("qty") or 1,
+                "Base Total": b.get("total_price") or 0.0,
+                "Current Total": current,
+                "New Total": current,  # 默认=当前
             })
 
-    df0 = pd.DataFrame(rows)
+    # numeric columns cast once, not float() per cell; explicit columns keep an empty editor valid
+    df0 = pd.DataFrame(
+        rows,
+        columns=["Pool", "Product", "Option", "Qty", "Base Total", "Current Total", "New Total"],
+    ).astype({"Qty": "float64", "Base Total": "float64", "Current Total": "float64", "New Total": "float64"})
 
 
     def _apply_from_editor(edited_df: pd.DataFrame):
         overrides = st.session_state.get("price_overrides", {}) or {}
-        for _, row in edited_df.iterrows():
-            k = f"{row['Pool']}|{row['Product']}|{row['Option']}"
-            base = float(row["Base Total"])
-            new = float(row["New Total"])
-            if abs(new - base) > 1e-9:
-                overrides[k] = new
+        changed = (edited_df["New Total"] - edited_df["Base Total"]).abs().to_numpy() > 1e-9
+        keys = zip(edited_df["Pool"], edited_df["Product"], edited_df["Option"])
+        for k, new, is_changed in zip(keys, edited_df["New Total"].to_numpy(dtype=float), changed):
+            if is_changed:
+                overrides[k] = float(new)
             else:
                 overrides.pop(k, None)
         st.session_state["price_overrides"] = overrides
@@ -1114,46 +1224,16 @@ if st.session_state.get("override_open") and state:
         st.rerun()
 
 
-    # 5) dialog if available, otherwise fallback panel
-    if hasattr(st, "dialog"):
-        @st.dialog("Price Override")
-        def _dlg():
-            edited = st.data_editor(
-                df0,
-                hide_index=True,
-                disabled=["Pool", "Product", "Option", "Qty", "Current Total"],
-                column_config={
-                    "New Total": st.column_config.NumberColumn(min_value=0.0, step=50.0, format="%.2f")
-                },
-                use_container_width=True,
-                key="override_editor",
-            )
-
-            c1, c2, c3 = st.columns([0.34, 0.33, 0.33])
-            with c1:
-                if st.button("Apply", type="primary", use_container_width=True):
-                    _apply_from_editor(edited)
-            with c2:
-                if st.button("Reset", use_container_width=True):
-                    st.session_state["price_overrides"] = {}
-                    st.session_state["override_open"] = False
-                    st.rerun()
-            with c3:
-                if st.button("Cancel", use_container_width=True):
-                    st.session_state["override_open"] = False
-                    st.rerun()
-
-
-        _dlg()
-    else:
-        st.subheader("Price Override")
+    def _render_override_editor(disabled: List[str], column_config: dict | None = None):
         edited = st.data_editor(
             df0,
             hide_index=True,
-            disabled=["Pool", "Product", "Option", "Qty", "Base Total", "Current Total"],
+            disabled=disabled,
+            column_config=column_config,
             use_container_width=True,
             key="override_editor",
         )
+
         c1, c2, c3 = st.columns([0.34, 0.33, 0.33])
         with c1:
             if st.button("Apply", type="primary", use_container_width=True):
@@ -1168,3 +1248,20 @@ if st.session_state.get("override_open") and state:
                 st.session_state["override_open"] = False
                 st.rerun()
 
+
+    # 5) dialog if available, otherwise fallback panel
+    if hasattr(st, "dialog"):
+        @st.dialog("Price Override")
+        def _dlg():
+            _render_override_editor(
+                disabled=["Pool", "Product", "Option", "Qty", "Current Total"],
+                column_config={
+                    "New Total": st.column_config.NumberColumn(min_value=0.0, step=50.0, format="%.2f")
+                },
+            )
+
+
+        _dlg()
+    else:
+        st.subheader("Price Override")
+        _render_override_editor(disabled=["Pool", "Product", "Option", "Qty", "Base Total", "Current Total"])